@@ -0,0 +1,366 @@
+import csv
+import sys
+import json
+import gzip
+import sqlite3
+import argparse
+import itertools
+from dictionary import load_dictionary, strip_markup
+import fuzzy_index
+from fuzzy_index import normalize_word
+
+BOX_FIELDS = ['id', 'name', 'article_title', 'created_at']
+WORD_FIELDS = ['id', 'word', 'review_count', 'trash_count', 'trash_date', 'success_count',
+               'added_date', 'last_review', 'next_review']
+INT_FIELDS = {'review_count', 'trash_count', 'success_count'}
+# CSV 每行一个单词，盒子信息带 box_ 前缀
+CSV_FIELDS = ['box_' + field for field in BOX_FIELDS] + WORD_FIELDS
+
+FORMATS = ('jsonl', 'csv', 'anki')
+
+
+def detect_format(path):
+    """根据文件扩展名判断格式（忽略 .gz 后缀）"""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.jsonl'):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.tsv', '.txt')):
+        return 'anki'
+    raise ValueError(f"无法识别文件格式: {path}，请使用 --format 指定")
+
+
+def open_file(path, mode, compress=None):
+    """打开文本文件，.gz 后缀或 compress=True 时使用 gzip"""
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def iter_rows(cursor, chunk_size=1000):
+    """分批从游标读取结果，内存占用与结果集大小无关"""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for row in rows:
+            yield row
+
+
+def iter_records(conn, box_ids=None, chunk_size=1000):
+    """按盒子顺序逐条返回 ('box', 盒子) 和 ('word', 单词) 记录，没有单词的盒子也会返回"""
+    conn.row_factory = sqlite3.Row
+    box_filter = ""
+    params = []
+    if box_ids:
+        box_filter = f"WHERE b.id IN ({','.join('?' * len(box_ids))})"
+        params = list(box_ids)
+    columns = [f"b.{field} AS box_{field}" for field in BOX_FIELDS] + [f"w.{field}" for field in WORD_FIELDS]
+    # 单条查询按盒子分组流式读取，避免每个盒子扫描一次单词表
+    cursor = conn.execute(
+        f"""SELECT {', '.join(columns)}
+            FROM boxes b
+            LEFT JOIN words w ON w.box_id = b.id
+            {box_filter}
+            ORDER BY b.id, w.id""",
+        params
+    )
+    current_box = None
+    for row in iter_rows(cursor, chunk_size):
+        if row['box_id'] != current_box:
+            current_box = row['box_id']
+            yield 'box', {field: row['box_' + field] for field in BOX_FIELDS}
+        if row['id'] is not None:
+            yield 'word', {field: row[field] for field in WORD_FIELDS}
+
+
+def write_jsonl(records, f):
+    for kind, record in records:
+        f.write(json.dumps({'type': kind, **record}, ensure_ascii=False) + '\n')
+
+
+def write_csv(records, f):
+    """每行一个单词；没有单词的盒子写成单词字段为空的一行"""
+    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    box = None
+    box_written = True
+    for kind, record in records:
+        if kind == 'box':
+            if not box_written:
+                writer.writerow(box)
+            box = {'box_' + field: record[field] for field in BOX_FIELDS}
+            box_written = False
+        else:
+            writer.writerow({**box, **record})
+            box_written = True
+    if not box_written:
+        writer.writerow(box)
+
+
+def _tsv_field(value):
+    return ' '.join(str(value).split())
+
+
+def write_anki(records, f):
+    """Anki 纯文本导入格式：正面为单词，背面为离线词典释义，标签为盒子名称"""
+    try:
+        dictionary = load_dictionary()
+    except (OSError, ValueError) as e:
+        print(f"离线词典加载失败，释义留空: {str(e)}", file=sys.stderr)
+        dictionary = None
+    f.write("#separator:tab\n#html:false\n#tags column:3\n")
+    writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+    tag = ""
+    for kind, record in records:
+        if kind == 'box':
+            tag = '_'.join(str(record['name']).split())
+        else:
+            definition = dictionary.lookup(record['word']) if dictionary is not None else None
+            writer.writerow([_tsv_field(record['word']), _tsv_field(definition or ''), tag])
+
+
+WRITERS = {'jsonl': write_jsonl, 'csv': write_csv, 'anki': write_anki}
+
+
+def export_boxes(db_path, path, fmt=None, box_ids=None, compress=None):
+    """流式导出选定盒子（默认全部）及其复习状态，返回导出的单词数"""
+    fmt = fmt or detect_format(path)
+    conn = sqlite3.connect(db_path)
+    counter = {'word': 0}
+
+    def counted(records):
+        for kind, record in records:
+            if kind == 'word':
+                counter['word'] += 1
+            yield kind, record
+
+    try:
+        with open_file(path, 'w', compress) as f:
+            WRITERS[fmt](counted(iter_records(conn, box_ids)), f)
+        return counter['word']
+    finally:
+        conn.close()
+
+
+def read_jsonl(f):
+    for line in f:
+        if line.strip():
+            record = json.loads(line)
+            kind = record.pop('type')
+            yield kind, record
+
+
+def read_csv(f):
+    current_box = None
+    for row in csv.DictReader(f):
+        box_id = row['box_id']
+        if box_id != current_box:
+            current_box = box_id
+            yield 'box', {field: row['box_' + field] for field in BOX_FIELDS}
+        if row['id']:
+            yield 'word', {field: row.get(field) for field in WORD_FIELDS}
+
+
+ANKI_SEPARATORS = {'tab': '\t', 'comma': ',', 'semicolon': ';', 'space': ' ', 'pipe': '|', 'colon': ':'}
+
+
+def _anki_headers(f):
+    """读取文件开头的 Anki 文件头（#key:value），返回 (文件头, 剩余行的迭代器)"""
+    headers = {}
+    for line in f:
+        if not line.startswith('#'):
+            return headers, itertools.chain([line], f)
+        key, _, value = line[1:].rstrip('\r\n').partition(':')
+        headers[key.strip().lower()] = value
+    return headers, iter(())
+
+
+def read_anki(f):
+    """读取 Anki 纯文本导出（含本工具导出的文件）
+
+    解析 separator、html 以及 guid/notetype/deck/tags 列位置等文件头；单词取第一个
+    非元数据列，盒子名称取牌组列，没有牌组列时取第一个标签。字段可以用双引号包含分隔符或换行。
+    """
+    headers, lines = _anki_headers(f)
+    separator = headers.get('separator', 'tab')
+    separator = ANKI_SEPARATORS.get(separator.strip().lower(), separator)
+    html_fields = headers.get('html', 'false').strip().lower() == 'true'
+
+    def column(name):
+        value = headers.get(name + ' column', '').strip()
+        return int(value) - 1 if value.isdigit() else None
+
+    deck_column = column('deck')
+    tags_column = column('tags')
+    meta_columns = {column(name) for name in ('guid', 'notetype', 'deck', 'tags')} - {None}
+    word_column = next(i for i in itertools.count() if i not in meta_columns)
+
+    current_box = None
+    for row in csv.reader(lines, delimiter=separator, quotechar='"'):
+        if len(row) <= word_column or not row[word_column].strip():
+            continue
+        word = row[word_column]
+        if html_fields:
+            word = strip_markup(word)
+        if deck_column is not None and deck_column < len(row) and row[deck_column].strip():
+            box_name = row[deck_column].strip()
+        else:
+            tags = row[tags_column].split() if tags_column is not None and tags_column < len(row) else []
+            box_name = tags[0] if tags else "Anki"
+        if box_name != current_box:
+            current_box = box_name
+            yield 'box', {'id': box_name, 'name': box_name}
+        yield 'word', {'word': word}
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv, 'anki': read_anki}
+
+
+def _value(record, field):
+    """CSV 中的空字符串视为 NULL"""
+    value = record.get(field)
+    if value == '' or value is None:
+        return 0 if field in INT_FIELDS else None
+    return int(value) if field in INT_FIELDS else value
+
+
+def _find_or_create_box(c, record):
+    """返回源盒子对应的盒子ID，之前导入过则复用，否则新建
+
+    源盒子由 (源盒子ID, 名称, 创建时间) 标识，对应关系保存在 import_box_map 表中，
+    因此重复导入同一文件会复用之前导入的盒子，而名称和创建时间相同的不同源盒子不会被合并。
+    """
+    created_at = _value(record, 'created_at')
+    source_key = json.dumps([str(record['id']), record['name'], created_at], ensure_ascii=False)
+    c.execute(
+        """SELECT m.box_id FROM import_box_map m
+           JOIN boxes b ON b.id = m.box_id
+           WHERE m.source_key = ?""",
+        (source_key,)
+    )
+    result = c.fetchone()
+    if result is not None:
+        return result[0]
+    c.execute(
+        "INSERT INTO boxes (name, article_title, created_at) VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+        (record['name'], _value(record, 'article_title'), created_at)
+    )
+    box_id = c.lastrowid
+    c.execute(
+        "INSERT OR REPLACE INTO import_box_map (source_key, box_id) VALUES (?, ?)",
+        (source_key, box_id)
+    )
+    return box_id
+
+
+def import_boxes(db_path, path, fmt=None, into_box_id=None, chunk_size=1000, compress=None):
+    """流式导入盒子和单词，每 chunk_size 个单词提交一次事务
+
+    源盒子与数据库中盒子的对应关系保存在 import_box_map 表中，之前导入过的盒子会被复用，
+    盒子中已存在的单词会被跳过，因此中断后重新运行导入不会产生重复。
+    指定 into_box_id 时全部导入该盒子。返回 (导入的单词数, 跳过的重复单词数)。
+    """
+    # 延迟导入，导出时不必加载 streamlit 和 pandas
+    from database import WordDatabase
+    fmt = fmt or detect_format(path)
+    WordDatabase(db_path)  # 确保表结构存在
+    conn = sqlite3.connect(db_path)
+    imported = skipped = pending = 0
+    try:
+        c = conn.cursor()
+        if into_box_id is not None:
+            c.execute("SELECT 1 FROM boxes WHERE id = ?", (into_box_id,))
+            if c.fetchone() is None:
+                raise ValueError(f"盒子不存在: {into_box_id}")
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS import_box_map
+            (source_key TEXT PRIMARY KEY,
+             box_id INTEGER NOT NULL)
+        """)
+        new_box_id = into_box_id
+        with open_file(path, 'r', compress) as f:
+            for kind, record in READERS[fmt](f):
+                if kind == 'box':
+                    if into_box_id is not None:
+                        continue
+                    new_box_id = _find_or_create_box(c, record)
+                    continue
+
+                if new_box_id is None:
+                    raise ValueError("文件格式错误: 单词记录出现在盒子记录之前")
+                word = record['word'].strip()
+                norm_key = normalize_word(word)
+                c.execute(
+                    "SELECT 1 FROM words WHERE box_id = ? AND norm_key = ?",
+                    (new_box_id, norm_key)
+                )
+                if not norm_key or c.fetchone() is not None:
+                    skipped += 1
+                    continue
+                c.execute(
+                    """INSERT INTO words
+                       (word, norm_key, box_id, review_count, trash_count, trash_date, success_count,
+                        added_date, last_review, next_review)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?)""",
+                    (word, norm_key, new_box_id,
+                     *(_value(record, field) for field in WORD_FIELDS[2:]))
+                )
+                fuzzy_index.index_word(c, c.lastrowid, norm_key)
+                imported += 1
+                pending += 1
+                if pending >= chunk_size:
+                    conn.commit()
+                    pending = 0
+        conn.commit()
+        return imported, skipped
+    except Exception as e:
+        conn.rollback()
+        committed = imported - pending
+        if committed == 0:
+            raise
+        raise RuntimeError(
+            f"{str(e)}（已提交 {committed} 个单词，修正后重新运行导入会跳过已导入的盒子和单词）"
+        ) from e
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导出或导入单词盒子（JSONL/CSV/Anki TSV）")
+    parser.add_argument('--db', default='words.db', help="数据库文件")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="导出盒子")
+    export_parser.add_argument('path', help="输出文件，.gz 后缀自动压缩")
+    export_parser.add_argument('--boxes', type=int, nargs='+', help="要导出的盒子ID，默认全部")
+    export_parser.add_argument('--format', choices=FORMATS, help="默认根据扩展名判断")
+    export_parser.add_argument('--gzip', action='store_true', default=None, help="强制使用 gzip 压缩")
+
+    import_parser = subparsers.add_parser('import', help="导入盒子")
+    import_parser.add_argument('path', help="输入文件，.gz 后缀自动解压")
+    import_parser.add_argument('--into', type=int, help="导入到已有的盒子ID，默认为每个盒子新建盒子")
+    import_parser.add_argument('--format', choices=FORMATS, help="默认根据扩展名判断")
+    import_parser.add_argument('--gzip', action='store_true', default=None, help="强制使用 gzip 解压")
+    import_parser.add_argument('--chunk-size', type=int, default=1000, help="每个事务导入的单词数")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == 'export':
+            count = export_boxes(args.db, args.path, args.format, args.boxes, args.gzip)
+            print(f"导出完成: {args.path} ({count} 个单词)")
+        else:
+            imported, skipped = import_boxes(args.db, args.path, args.format, args.into,
+                                             args.chunk_size, args.gzip)
+            print(f"导入完成: {imported} 个单词，跳过 {skipped} 个重复单词")
+    except Exception as e:
+        print(f"出错: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,8 @@ import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
 import streamlit as st
+import fuzzy_index
+from fuzzy_index import normalize_word
 
 class WordDatabase:
     def __init__(self, db_path='words.db'):
@@ -31,6 +33,7 @@ class WordDatabase:
             CREATE TABLE IF NOT EXISTS words
             (id INTEGER PRIMARY KEY AUTOINCREMENT,
              word TEXT NOT NULL,
+             norm_key TEXT,
              box_id INTEGER,
              review_count INTEGER DEFAULT 0,
              trash_count INTEGER DEFAULT 0,
@@ -66,6 +69,17 @@ class WordDatabase:
             c.execute("ALTER TABLE words ADD COLUMN next_review TIMESTAMP")
         if 'review_count' not in columns:
             c.execute("ALTER TABLE words ADD COLUMN review_count INTEGER DEFAULT 0")
+        if 'norm_key' not in columns:
+            c.execute("ALTER TABLE words ADD COLUMN norm_key TEXT")
+        
+        # 创建模糊查重索引，并为旧数据补全规范化键和索引
+        fuzzy_index.init_index(c)
+        c.execute("SELECT id, word FROM words WHERE norm_key IS NULL")
+        rows = [(word_id, normalize_word(word)) for word_id, word in c.fetchall()]
+        c.executemany("UPDATE words SET norm_key = ? WHERE id = ?", [(key, word_id) for word_id, key in rows])
+        fuzzy_index.index_words(c, rows)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_words_norm_key ON words (norm_key)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_words_box_id ON words (box_id)")
         
         # 初始化复习计数器
         c.execute("INSERT OR IGNORE INTO review_counter (id, count) VALUES (1, 0)")
@@ -120,40 +134,133 @@ class WordDatabase:
             conn.close()
     
     def word_exists(self, box_id, word):
-        """检查单词是否已存在于盒子中"""
+        """检查单词是否已存在于盒子中（忽略大小写和首尾空白）"""
         conn = self.get_connection()
         try:
             c = conn.cursor()
             c.execute(
-                "SELECT COUNT(*) FROM words WHERE box_id = ? AND word = ?",
-                (box_id, word)
+                "SELECT COUNT(*) FROM words WHERE box_id = ? AND norm_key = ?",
+                (box_id, normalize_word(word))
             )
             exists = c.fetchone()[0] > 0
             return exists
         finally:
             conn.close()
     
+    def find_similar_words(self, words):
+        """在所有盒子中批量查找与给定单词相同或相近的单词
+
+        返回 {规范化键: [(编辑距离, 单词ID, 单词, 规范化键, 盒子ID, 盒子名称)]}
+        """
+        conn = self.get_connection()
+        try:
+            return fuzzy_index.find_similar(conn.cursor(), words)
+        except Exception as e:
+            st.error(f"查找相近单词时出错: {str(e)}")
+            return {}
+        finally:
+            conn.close()
+    
+    def warn_similar_words(self, box_id, words, max_warnings=20):
+        """提示其他盒子中的重复单词以及所有盒子中拼写相近的单词"""
+        similar = self.find_similar_words(words)
+        warnings = []
+        for word in words:
+            norm_key = normalize_word(word)
+            # 当前盒子中的完全重复由调用方处理
+            matches = [
+                match for match in similar.get(norm_key, [])
+                if match[4] != box_id or match[3] != norm_key
+            ]
+            for distance, _, other_word, _, _, box_name in matches[:5]:
+                if distance == 0:
+                    warnings.append(f"单词 '{word}' 已存在于盒子 '{box_name}' 中")
+                else:
+                    warnings.append(f"单词 '{word}' 与盒子 '{box_name}' 中的 '{other_word}' 相近，请检查拼写")
+        # 同一批新单词之间的相近提示，每对只提示一次
+        batch_words = {normalize_word(word): word for word in words}
+        for norm_key, others in fuzzy_index.find_similar_in_batch(words).items():
+            for other in others:
+                if norm_key < other:
+                    warnings.append(f"单词 '{batch_words[norm_key]}' 与本次添加的 '{batch_words[other]}' 相近，请检查拼写")
+        for warning in warnings[:max_warnings]:
+            st.warning(warning)
+        if len(warnings) > max_warnings:
+            st.warning(f"还有 {len(warnings) - max_warnings} 条重复或相近提示未显示")
+    
     def add_word(self, box_id, word):
         """添加新单词到指定的盒子"""
+        word = word.strip()
+        norm_key = normalize_word(word)
+        if not norm_key:
+            return False
         if self.word_exists(box_id, word):
             st.warning(f"单词 '{word}' 已存在于此盒子中")
             return False
         
+        self.warn_similar_words(box_id, [word])
+        
         conn = self.get_connection()
         try:
             c = conn.cursor()
             c.execute(
-                "INSERT INTO words (word, box_id, added_date) VALUES (?, ?, ?)",
-                (word, box_id, datetime.now())
+                "INSERT INTO words (word, norm_key, box_id, added_date) VALUES (?, ?, ?, ?)",
+                (word, norm_key, box_id, datetime.now())
             )
+            fuzzy_index.index_word(c, c.lastrowid, norm_key)
             conn.commit()
             return True
         except Exception as e:
             st.error(f"添加单词时出错: {str(e)}")
+            conn.rollback()
             return False
         finally:
             conn.close()
     
+    def add_words(self, box_id, words):
+        """批量添加单词到指定的盒子，在一个事务中完成，返回成功添加的数量"""
+        new_words = {}
+        for word in words:
+            word = word.strip()
+            norm_key = normalize_word(word)
+            if norm_key and norm_key not in new_words:
+                new_words[norm_key] = word
+        if not new_words:
+            return 0
+        
+        conn = self.get_connection()
+        try:
+            c = conn.cursor()
+            existing = set()
+            for chunk in fuzzy_index.chunked(new_words, fuzzy_index.MAX_SQL_PARAMS - 1):
+                placeholders = ",".join("?" * len(chunk))
+                c.execute(
+                    f"SELECT norm_key FROM words WHERE box_id = ? AND norm_key IN ({placeholders})",
+                    [box_id] + chunk
+                )
+                existing.update(row[0] for row in c.fetchall())
+            if existing:
+                st.warning(f"{len(existing)} 个单词已存在于此盒子中，已跳过")
+            new_words = {key: word for key, word in new_words.items() if key not in existing}
+            
+            self.warn_similar_words(box_id, list(new_words.values()))
+            
+            now = datetime.now()
+            for norm_key, word in new_words.items():
+                c.execute(
+                    "INSERT INTO words (word, norm_key, box_id, added_date) VALUES (?, ?, ?, ?)",
+                    (word, norm_key, box_id, now)
+                )
+                fuzzy_index.index_word(c, c.lastrowid, norm_key)
+            conn.commit()
+            return len(new_words)
+        except Exception as e:
+            st.error(f"批量添加单词时出错: {str(e)}")
+            conn.rollback()
+            return 0
+        finally:
+            conn.close()
+    
     def increment_review_counter(self):
         """增加复习计数器，每10次返回True"""
         conn = self.get_connection()
@@ -221,8 +328,10 @@ class WordDatabase:
         try:
             c = conn.cursor()
             c.execute("DELETE FROM words WHERE id = ?", (word_id,))
+            deleted = c.rowcount
+            fuzzy_index.unindex_word(c, word_id)
             
-            if c.rowcount == 0:
+            if deleted == 0:
                 st.error("删除单词失败：找不到指定的单词")
             else:
                 st.success("单词已成功删除")
@@ -0,0 +1,296 @@
+import os
+import io
+import re
+import sys
+import json
+import gzip
+import html
+import mmap
+import struct
+import argparse
+from fuzzy_index import normalize_word
+
+# 二进制词典文件格式:
+#   头部: 魔数(8字节) + 词条数(uint32) + 保留(uint32)
+#   索引: 每个词条 (键偏移, 键长度, 释义偏移, 释义长度)，均为 uint32，按键的 UTF-8 字节序排列
+#   数据: 所有键和释义的 UTF-8 字节，偏移相对于数据区起点
+MAGIC = b'ERDICT1\x00'
+HEADER = struct.Struct('<8sII')
+ENTRY = struct.Struct('<IIII')
+
+DEFAULT_DICT_PATH = 'dictionary.bin'
+
+# StarDict 字段类型：纯文本类型直接使用，标记语言类型去掉标签，其余（图片、音频等）忽略
+STARDICT_TEXT_TYPES = 'mltyw'
+STARDICT_MARKUP_TYPES = 'ghxk'
+
+
+def _read_json(path):
+    """读取 JSON 词典，支持 {单词: 释义} 或 [{"word": ..., "definition": ...}]"""
+    with _open_text(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        for word, definition in data.items():
+            yield word, definition
+    else:
+        for item in data:
+            yield item['word'], item['definition']
+
+
+def _read_tsv(path):
+    """读取 TSV 词典，每行为 单词<TAB>释义"""
+    with _open_text(path) as f:
+        for line in f:
+            columns = line.rstrip('\r\n').split('\t', 1)
+            if len(columns) == 2 and columns[0].strip():
+                yield columns[0], columns[1]
+
+
+def _read_stardict(ifo_path):
+    """读取 StarDict 词典（.ifo/.idx/.dict，支持 .idx.gz 和 .dict.dz）"""
+    base = ifo_path[:-len('.ifo')]
+    info = {}
+    with open(ifo_path, encoding='utf-8') as f:
+        for line in f:
+            if '=' in line:
+                key, value = line.split('=', 1)
+                info[key.strip()] = value.strip()
+    offset_format = '>Q' if info.get('idxoffsetbits') == '64' else '>I'
+    sametypesequence = info.get('sametypesequence', '')
+    offset_size = struct.calcsize(offset_format)
+
+    idx_path = base + '.idx' if os.path.exists(base + '.idx') else base + '.idx.gz'
+    dict_path = base + '.dict' if os.path.exists(base + '.dict') else base + '.dict.dz'
+    with _open_binary(idx_path) as f:
+        idx = f.read()
+    with _open_binary(dict_path) as f:
+        dict_data = f.read()
+
+    pos = 0
+    while pos < len(idx):
+        end = idx.index(b'\x00', pos)
+        word = idx[pos:end].decode('utf-8')
+        pos = end + 1
+        offset = struct.unpack_from(offset_format, idx, pos)[0]
+        pos += offset_size
+        size = struct.unpack_from('>I', idx, pos)[0]
+        pos += 4
+        fields = _stardict_fields(dict_data[offset:offset + size], sametypesequence)
+        texts = [_stardict_text(field_type, raw) for field_type, raw in fields]
+        yield word, '\n'.join(text for text in texts if text)
+
+
+def _stardict_fields(data, sametypesequence):
+    """按类型序列拆分 StarDict 词条数据，返回 [(类型, 原始字节)]
+
+    未设置 sametypesequence 时每个字段以类型字符开头；小写类型为 NUL 结尾的字符串，
+    大写类型为 4 字节长度加数据。设置时省略类型字符，且最后一个字段省略结尾或长度。
+    """
+    fields = []
+    pos = 0
+    types = iter(sametypesequence) if sametypesequence else None
+    while pos < len(data):
+        if types is None:
+            field_type = chr(data[pos])
+            pos += 1
+            last = False
+        else:
+            field_type = next(types, None)
+            if field_type is None:
+                break
+            last = len(fields) == len(sametypesequence) - 1
+        if last:
+            end = len(data)
+            fields.append((field_type, data[pos:end]))
+        elif field_type.islower():
+            end = data.find(b'\x00', pos)
+            if end < 0:
+                end = len(data)
+            fields.append((field_type, data[pos:end]))
+            end += 1
+        else:
+            size = struct.unpack_from('>I', data, pos)[0]
+            pos += 4
+            end = pos + size
+            fields.append((field_type, data[pos:end]))
+        pos = end
+    return fields
+
+
+def _stardict_text(field_type, raw):
+    """将 StarDict 字段转换为纯文本，非文本字段返回空字符串"""
+    if field_type not in STARDICT_TEXT_TYPES + STARDICT_MARKUP_TYPES:
+        return ''
+    text = raw.decode('utf-8', errors='replace')
+    if field_type in STARDICT_MARKUP_TYPES:
+        text = strip_markup(text)
+    return text.strip()
+
+
+def strip_markup(text):
+    """去掉 HTML/XML 标签并还原字符实体，<br> 转为换行"""
+    text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
+    return html.unescape(re.sub(r'<[^>]+>', '', text))
+
+
+def _open_binary(path):
+    """打开文件，.gz/.dz 文件自动解压（dictzip 与 gzip 兼容）"""
+    if path.endswith(('.gz', '.dz')):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _open_text(path):
+    return io.TextIOWrapper(_open_binary(path), encoding='utf-8')
+
+
+def read_source(path):
+    """根据文件扩展名读取源词典，逐条返回 (单词, 释义)"""
+    if path.endswith('.ifo'):
+        return _read_stardict(path)
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.ifo'):
+        raise ValueError(f"StarDict 词典请指定未压缩的 .ifo 文件: {path}")
+    if name.endswith('.json'):
+        return _read_json(path)
+    if name.endswith(('.tsv', '.txt')):
+        return _read_tsv(path)
+    raise ValueError(f"不支持的词典格式: {path}")
+
+
+def build_dictionary(source_path, output_path=DEFAULT_DICT_PATH):
+    """将源词典一次性转换为带排序索引的二进制词典文件，返回词条数"""
+    entries = {}
+    for word, definition in read_source(source_path):
+        key = normalize_word(word).encode('utf-8')
+        definition = str(definition).strip()
+        if not key or not definition:
+            continue
+        # 同一个词出现多次时合并释义
+        if key in entries:
+            if definition not in entries[key]:
+                entries[key].append(definition)
+        else:
+            entries[key] = [definition]
+
+    keys = sorted(entries)
+    index = bytearray()
+    data = bytearray()
+    for key in keys:
+        definition = '\n'.join(entries[key]).encode('utf-8')
+        key_offset = len(data)
+        data += key
+        def_offset = len(data)
+        data += definition
+        index += ENTRY.pack(key_offset, len(key), def_offset, len(definition))
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(keys), 0))
+        f.write(index)
+        f.write(data)
+    os.replace(tmp_path, output_path)
+    return len(keys)
+
+
+class OfflineDictionary:
+    """内存映射的离线词典，通过二分查找实现亚毫秒级查询"""
+
+    def __init__(self, path=DEFAULT_DICT_PATH):
+        self.path = path
+        if os.path.getsize(path) < HEADER.size:
+            raise ValueError(f"无效的词典文件: {path}")
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, _ = HEADER.unpack_from(self._mm, 0)
+        self._data_start = HEADER.size + self._count * ENTRY.size
+        valid = magic == MAGIC and len(self._mm) >= self._data_start
+        if valid and self._count:
+            # 数据按键顺序写入，最后一个词条的释义位于数据区末尾
+            _, _, def_offset, def_len = self._entry(self._count - 1)
+            valid = len(self._mm) >= self._data_start + def_offset + def_len
+        if not valid:
+            self._mm.close()
+            raise ValueError(f"无效的词典文件: {path}")
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, word):
+        return self.lookup(word) is not None
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self._mm, HEADER.size + i * ENTRY.size)
+
+    def _key(self, key_offset, key_len):
+        start = self._data_start + key_offset
+        return self._mm[start:start + key_len]
+
+    def lookup(self, word):
+        """查询单词释义，找不到时返回 None"""
+        key = normalize_word(word).encode('utf-8')
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_offset, key_len, def_offset, def_len = self._entry(mid)
+            current = self._key(key_offset, key_len)
+            if current < key:
+                lo = mid + 1
+            elif current > key:
+                hi = mid
+            else:
+                start = self._data_start + def_offset
+                return self._mm[start:start + def_len].decode('utf-8')
+        return None
+
+    def lookup_many(self, words):
+        """批量查询，返回 {单词: 释义}，只包含查到的单词"""
+        definitions = {}
+        for word in set(words):
+            definition = self.lookup(word)
+            if definition is not None:
+                definitions[word] = definition
+        return definitions
+
+    def close(self):
+        self._mm.close()
+
+
+def load_dictionary(path=None):
+    """加载离线词典，文件不存在时返回 None，文件损坏时抛出 ValueError"""
+    path = path or os.environ.get('ENGLISH_REVIEW_DICT', DEFAULT_DICT_PATH)
+    if not os.path.exists(path):
+        return None
+    return OfflineDictionary(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="构建或查询离线词典")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="从 StarDict(.ifo)/JSON/TSV 构建二进制词典")
+    build_parser.add_argument('source', help="源词典文件")
+    build_parser.add_argument('-o', '--output', default=DEFAULT_DICT_PATH, help="输出文件")
+
+    lookup_parser = subparsers.add_parser('lookup', help="查询单词")
+    lookup_parser.add_argument('words', nargs='+', help="要查询的单词")
+    lookup_parser.add_argument('-d', '--dict', default=DEFAULT_DICT_PATH, help="二进制词典文件")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == 'build':
+            count = build_dictionary(args.source, args.output)
+            print(f"词典构建完成: {args.output} ({count} 个词条)")
+        else:
+            dictionary = OfflineDictionary(args.dict)
+            for word in args.words:
+                print(f"{word}: {dictionary.lookup(word) or '(未找到)'}")
+            dictionary.close()
+    except Exception as e:
+        print(f"出错: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
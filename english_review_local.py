@@ -6,6 +6,7 @@ import sqlite3
 import pandas as pd
 import time
 from database import WordDatabase
+from dictionary import load_dictionary
 
 # 设置页面配置
 st.set_page_config(
@@ -64,9 +65,20 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_dictionary():
+    """每个进程只映射一次离线词典，返回 (词典, 错误信息)，未构建词典时词典为 None"""
+    try:
+        return load_dictionary(), None
+    except (OSError, ValueError) as e:
+        return None, str(e)
+
 def main():
     # 初始化数据库
     db = WordDatabase()
+    dictionary, dictionary_error = get_dictionary()
+    if dictionary_error:
+        st.warning(f"离线词典加载失败，将不显示释义: {dictionary_error}")
     
     # 页面标题
     st.title("🌘 记忆系统")
@@ -150,6 +162,15 @@ def main():
                     value=st.session_state.new_word
                 )
 
+                with st.form("bulk_add", clear_on_submit=True):
+                    bulk_words = st.text_area("批量添加（每行一个单词）")
+                    if st.form_submit_button("批量添加"):
+                        added = db.add_words(current_box_id, bulk_words.splitlines())
+                        if added:
+                            st.success(f"✅ 成功添加 {added} 个单词")
+                            st.session_state.review_words = []
+                            st.session_state.reviewed_words = set()
+
             # 复习部分
             st.subheader("🔄 单词复习")
             col1, col2 = st.columns([1, 4])
@@ -188,6 +209,11 @@ def main():
                     """, unsafe_allow_html=True)
                     st.progress(reviewed_count / total_words)
 
+                    # 批量查询本页所有单词的释义
+                    definitions = {}
+                    if dictionary is not None:
+                        definitions = dictionary.lookup_many(word for _, word, _, _ in st.session_state.review_words)
+
                     # 使用网格布局显示单词
                     for i, (word_id, word, review_count, trash_count) in enumerate(st.session_state.review_words):
                         if word_id in st.session_state.reviewed_words:
@@ -196,6 +222,8 @@ def main():
                                 key=f"reviewed_{word_id}", 
                                 disabled=True
                             )
+                            if word in definitions:
+                                st.caption(definitions[word])
                         else:
                             col1, col2, col3 = st.columns([4, 1, 1])
                             with col1:
@@ -218,6 +246,8 @@ def main():
                                     else:
                                         st.session_state.confirm_delete = word_id
                                         st.warning(f"再次点击删除按钮确认删除单词 '{word}'")
+                            if word in definitions:
+                                st.caption(definitions[word])
                             st.markdown("---")
 
                     if len(st.session_state.reviewed_words) == total_words:
@@ -239,8 +269,13 @@ def main():
             st.info(f"队列中有 {len(trash_stats)} 个单词")
             st.write("每10次点击开始复习时，最早加入的5个单词会进入复习列表")
             st.write("成功记忆5次的单词会自动移出错误队列")
+            definitions = {}
+            if dictionary is not None:
+                definitions = dictionary.lookup_many(trash_stats['word'])
             for _, row in trash_stats.iterrows():
                 with st.expander(f"📖 {row['word']} (错误: {row['trash_count']}, 成功: {row['success_count']}/5)", expanded=True):
+                    if row['word'] in definitions:
+                        st.write(f"释义: {definitions[row['word']]}")
                     st.write(f"来自: {row['box_name']}")
                     st.write(f"总复习次数: {row['review_count']}")
                     error_rate = row['trash_count'] / (row['review_count'] + 1) * 100
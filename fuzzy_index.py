@@ -0,0 +1,156 @@
+# 模糊查重使用删除邻域索引（SymSpell 思路）：word_variants 表保存每个单词规范化键
+# 删去一个字符后的所有变体。两个单词的编辑距离（相邻交换算一次编辑）不超过 1 时，
+# 即一次插入、删除、替换或相邻交换，各自删去至多一个字符后必然相同，因此只要较长的
+# 单词不短于 FUZZY_MIN_LENGTH 就能通过索引查到；查询代价只与单词长度有关，与单词总数无关。距离为 2 的单词不保证能查到，
+# 所以相近阈值固定为 1。
+
+# 相近单词的最大编辑距离，与删除邻域索引能保证查到的范围一致
+MAX_DISTANCE = 1
+# 短于此长度的单词不生成删除变体，避免极短变体对应大量单词
+FUZZY_MIN_LENGTH = 4
+# SQLite 单条语句的参数个数上限较低，IN 查询分批执行
+MAX_SQL_PARAMS = 900
+
+
+def normalize_word(word):
+    """单词规范化键：去除首尾空白、合并连续空白并忽略大小写"""
+    return ' '.join(word.split()).casefold()
+
+
+def deletion_variants(norm_key):
+    """规范化键删去一个字符后的所有变体，过短的单词不生成变体"""
+    if len(norm_key) < FUZZY_MIN_LENGTH:
+        return set()
+    return {norm_key[:i] + norm_key[i + 1:] for i in range(len(norm_key))}
+
+
+def neighbourhood(norm_key):
+    """规范化键本身及其删除变体"""
+    return {norm_key} | deletion_variants(norm_key)
+
+
+def osa_distance(a, b):
+    """最优字符串对齐距离：插入、删除、替换和相邻交换各算一次编辑"""
+    if a == b:
+        return 0
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def init_index(cursor):
+    """创建删除邻域索引表，新建时为已有单词补全索引"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'word_variants'")
+    exists = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS word_variants
+        (variant TEXT NOT NULL,
+         word_id INTEGER NOT NULL)
+    ''')
+    if not exists:
+        rows = cursor.execute("SELECT id, norm_key FROM words WHERE norm_key IS NOT NULL").fetchall()
+        index_words(cursor, rows)
+    # 先批量写入再建索引，比逐行维护索引快得多
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_word_variants_variant ON word_variants (variant)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_word_variants_word_id ON word_variants (word_id)")
+
+
+def index_words(cursor, rows):
+    """为 (单词ID, 规范化键) 写入删除邻域索引，需与插入单词在同一事务中调用"""
+    cursor.executemany(
+        "INSERT INTO word_variants (variant, word_id) VALUES (?, ?)",
+        ((variant, word_id) for word_id, norm_key in rows for variant in deletion_variants(norm_key))
+    )
+
+
+def index_word(cursor, word_id, norm_key):
+    """为新插入的单词写入删除邻域索引"""
+    index_words(cursor, [(word_id, norm_key)])
+
+
+def unindex_word(cursor, word_id):
+    """删除单词的删除邻域索引"""
+    cursor.execute("DELETE FROM word_variants WHERE word_id = ?", (word_id,))
+
+
+def chunked(items, size=MAX_SQL_PARAMS):
+    """将列表按 SQL 参数上限分批"""
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def find_similar(cursor, words):
+    """批量查找与给定单词相同或相近的已有单词
+
+    返回 {规范化键: [(编辑距离, 单词ID, 单词, 规范化键, 盒子ID, 盒子名称)]}，按距离排序。
+    所有单词的查询键合并后通过索引分批查询，不逐个单词访问数据库。
+    """
+    query_keys = {}  # 查询键 -> 需要它的规范化键
+    targets = set()
+    for word in words:
+        norm_key = normalize_word(word)
+        if not norm_key:
+            continue
+        targets.add(norm_key)
+        for key in neighbourhood(norm_key):
+            query_keys.setdefault(key, set()).add(norm_key)
+    if not targets:
+        return {}
+
+    candidates = {}
+    select = """SELECT w.id, w.word, w.norm_key, w.box_id, b.name
+                FROM words w
+                JOIN boxes b ON w.box_id = b.id"""
+    # 每个查询键在语句中出现两次
+    for chunk in chunked(query_keys, MAX_SQL_PARAMS // 2):
+        placeholders = ",".join("?" * len(chunk))
+        # 已有单词等于查询键，或已有单词的删除变体等于查询键
+        for row in cursor.execute(
+            f"""{select} WHERE w.norm_key IN ({placeholders})
+                UNION
+                {select} JOIN word_variants v ON v.word_id = w.id
+                WHERE v.variant IN ({placeholders})""",
+            chunk + chunk
+        ):
+            candidates[row[0]] = row
+
+    results = {norm_key: [] for norm_key in targets}
+    for word_id, word, norm_key, box_id, box_name in candidates.values():
+        related = set()
+        for key in neighbourhood(norm_key):
+            related |= query_keys.get(key, set())
+        for target in related:
+            distance = osa_distance(target, norm_key)
+            if distance <= MAX_DISTANCE:
+                results[target].append((distance, word_id, word, norm_key, box_id, box_name))
+    for matches in results.values():
+        matches.sort(key=lambda item: (item[0], item[2]))
+    return results
+
+
+def find_similar_in_batch(words):
+    """查找同一批单词之间相近（不完全相同）的单词，返回 {规范化键: [相近的规范化键]}"""
+    keys = {normalize_word(word) for word in words} - {''}
+    buckets = {}
+    for norm_key in keys:
+        for key in neighbourhood(norm_key):
+            buckets.setdefault(key, set()).add(norm_key)
+    results = {}
+    for norm_key in keys:
+        related = set()
+        for key in neighbourhood(norm_key):
+            related |= buckets[key]
+        related.discard(norm_key)
+        matches = sorted(other for other in related if osa_distance(norm_key, other) <= MAX_DISTANCE)
+        if matches:
+            results[norm_key] = matches
+    return results
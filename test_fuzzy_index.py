@@ -0,0 +1,94 @@
+import random
+import sqlite3
+import string
+
+import pytest
+
+import fuzzy_index
+from fuzzy_index import find_similar, find_similar_in_batch, osa_distance
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(':memory:')
+    c = conn.cursor()
+    c.execute("CREATE TABLE boxes (id INTEGER PRIMARY KEY, name TEXT)")
+    c.execute("CREATE TABLE words (id INTEGER PRIMARY KEY, word TEXT, norm_key TEXT, box_id INTEGER)")
+    c.execute("INSERT INTO boxes (id, name) VALUES (1, 'box')")
+    fuzzy_index.init_index(c)
+    yield c
+    conn.close()
+
+
+def add(c, *words):
+    for word in words:
+        norm_key = fuzzy_index.normalize_word(word)
+        c.execute("INSERT INTO words (word, norm_key, box_id) VALUES (?, ?, 1)", (word, norm_key))
+        fuzzy_index.index_word(c, c.lastrowid, norm_key)
+
+
+def matched(c, query):
+    norm_key = fuzzy_index.normalize_word(query)
+    return [(distance, word) for distance, _, word, *_ in find_similar(c, [query])[norm_key]]
+
+
+def test_osa_distance_counts_adjacent_swap_once():
+    assert osa_distance('apple', 'aplpe') == 1
+    assert osa_distance('from', 'form') == 1
+    assert osa_distance('apple', 'apples') == 1
+    assert osa_distance('acomodate', 'accommodate') == 2
+
+
+@pytest.mark.parametrize('query, word', [
+    ('aplpe', 'apple'),
+    ('form', 'from'),
+    ('recieve', 'receive'),
+    ('aple', 'apple'),
+    ('apples', 'Apple'),
+    ('bananna', 'banana'),
+    ('cat', 'cats'),
+])
+def test_distance_one_typos_are_found(cursor, query, word):
+    add(cursor, word)
+    assert matched(cursor, query) == [(1, word)]
+
+
+def test_exact_match_ignores_case_and_spacing(cursor):
+    add(cursor, 'Ice  Cream')
+    assert matched(cursor, ' ice cream ') == [(0, 'Ice  Cream')]
+
+
+@pytest.mark.parametrize('query, word', [
+    ('acomodate', 'accommodate'),
+    ('recieved', 'receive'),
+    ('bear', 'bare'),
+])
+def test_distance_two_is_not_reported(cursor, query, word):
+    add(cursor, word)
+    assert matched(cursor, query) == []
+
+
+def test_index_finds_every_distance_one_pair(cursor):
+    random.seed(0)
+    words = {''.join(random.choices('abcde', k=random.randint(4, 7))) for _ in range(300)}
+    add(cursor, *words)
+    for query in list(words)[:50]:
+        expected = sorted(word for word in words if osa_distance(query, word) <= 1)
+        assert sorted(word for _, word in matched(cursor, query)) == expected
+
+
+def test_deleted_word_is_not_found(cursor):
+    add(cursor, 'apple')
+    word_id = cursor.lastrowid
+    cursor.execute("DELETE FROM words WHERE id = ?", (word_id,))
+    fuzzy_index.unindex_word(cursor, word_id)
+    assert matched(cursor, 'aple') == []
+
+
+def test_batch_near_duplicates():
+    assert find_similar_in_batch(['Banana', 'bananas', 'cherry', 'chery ', 'dog']) == {
+        'banana': ['bananas'],
+        'bananas': ['banana'],
+        'cherry': ['chery'],
+        'chery': ['cherry'],
+    }